@@ -1,22 +1,61 @@
 # main.py (versión actualizada)
+import os
 import time
+import logging
 import asyncio
 import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Annotated, Dict, Any, Optional, List
 from collections import deque
+from itertools import count
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+import msgspec
+import orjson
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, Column, Integer, Float, String, JSON, DateTime, desc
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import create_engine, event, inspect, Column, Index, Integer, Float, String, JSON, DateTime, desc, func, select, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
 
 # Configuración de base de datos SQLite
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sensors.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite admite un solo escritor: una conexión compartida por el hilo del event loop
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=QueuePool,
+    pool_size=1,
+    max_overflow=0
+)
+
+# WAL permite lecturas concurrentes con el escritor; synchronous=NORMAL ahorra un fsync por commit
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _):
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+# Sesión por hilo; los objetos siguen legibles tras commit aunque otra corrutina cierre la sesión
+SessionLocal = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+)
 Base = declarative_base()
 
 # Modelo para la base de datos
@@ -40,38 +79,107 @@ class ActionData(Base):
     right_motor = Column(Integer)
     source = Column(String(50), default="api")  # 'api' o 'websocket'
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Índice de cobertura: "última acción" se resuelve sin leer la fila (id es el rowid)
+    __table_args__ = (
+        Index(
+            "ix_action_cover",
+            timestamp.desc(), left_motor, right_motor, source, created_at
+        ),
+    )
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+# Crear tablas al arrancar (CREATE_TABLES=0 lo desactiva cuando el esquema se gestiona aparte)
+CREATE_TABLES = os.getenv("CREATE_TABLES", "1") == "1"
 
-# Modelos Pydantic para validación
-class GyroData(BaseModel):
+# Índices que ya no usa ninguna consulta: se eliminan de bases ya desplegadas
+OBSOLETE_INDEXES = ("ix_sensor_ts_desc",)
+
+def init_db():
+    """Crear tablas e índices faltantes con una sola inspección del esquema"""
+    with engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    
+    inspector = inspect(engine)
+    if not all(inspector.has_table(table.name) for table in Base.metadata.sorted_tables):
+        Base.metadata.create_all(bind=engine)
+        return
+    
+    # create_all no agrega índices a tablas existentes: crearlos en bases ya desplegadas
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+
+# Modelos msgspec para validación: el JSON se decodifica directo a structs tipados
+class GyroData(msgspec.Struct):
     angle: Optional[float] = None
     rate: Optional[float] = None
     calibrated: Optional[bool] = None
 
-class IRSensorData(BaseModel):
-    proximity: Optional[int] = None
+# Entero que entra en una columna INTEGER de SQLite (64 bits con signo): lo que
+# no entra se rechaza con 422 antes de encolarse, no al guardar el lote
+DbInt = Annotated[int, msgspec.Meta(ge=-2**63, le=2**63 - 1)]
+
+class IRSensorData(msgspec.Struct):
+    proximity: Optional[DbInt] = None
     remote_buttons: Optional[Any] = None
-    beacon_distance: Optional[int] = None
-    beacon_heading: Optional[int] = None
+    beacon_distance: Optional[DbInt] = None
+    beacon_heading: Optional[DbInt] = None
 
-class RobotInfo(BaseModel):
+class RobotInfo(msgspec.Struct):
     platform: str
     python_version: str
 
-class SensorPayload(BaseModel):
-    sample_id: int
+class SensorPayload(msgspec.Struct):
+    sample_id: DbInt
     timestamp: float
     ir_sensor: IRSensorData
     # gyro_sensor: GyroData
     robot_info: RobotInfo
 
-class ActionPayload(BaseModel):
-    left_motor: int = Field(..., ge=-100, le=100)  # Valor entre -100 y 100
-    right_motor: int = Field(..., ge=-100, le=100) # Valor entre -100 y 100
+MotorValue = Annotated[int, msgspec.Meta(ge=-100, le=100)]  # Valor entre -100 y 100
+
+class ActionPayload(msgspec.Struct):
+    left_motor: MotorValue
+    right_motor: MotorValue
     source: Optional[str] = "api"  # 'api' o 'manual'
 
+def msgspec_body(model):
+    """Dependencia que decodifica y valida el body con un decoder precompilado"""
+    # strict=False: misma coerción laxa que Pydantic ("50" y 50.0 -> 50)
+    decoder = msgspec.json.Decoder(model, strict=False)
+    
+    async def decode_body(request: Request):
+        try:
+            return decoder.decode(await request.body())
+        except msgspec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    return decode_body
+
+def _inline_refs(node, defs: Dict[str, Any]):
+    """Reemplazar los $ref locales de un schema de msgspec por su definición"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items() if key != "$defs"}
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+def msgspec_openapi(model) -> Dict[str, Any]:
+    """openapi_extra con el requestBody de `model` (msgspec_body no lo declara solo)"""
+    schema = msgspec.json.schema(model)
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": _inline_refs(schema, schema.get("$defs", {}))}},
+            "required": True
+        }
+    }
+
+# Modelos Pydantic para respuestas
 class ActionResponse(BaseModel):
     id: int
     left_motor: int
@@ -80,13 +188,12 @@ class ActionResponse(BaseModel):
     source: str
     created_at: datetime
 
-# Dependencia de base de datos
-def get_db():
-    db = SessionLocal()
+# Dependencia de base de datos (async para que la sesión viva en el hilo del event loop)
+async def get_db():
     try:
-        yield db
+        yield SessionLocal()
     finally:
-        db.close()
+        SessionLocal.remove()
 
 # Inicializar FastAPI
 app = FastAPI(title="Robot Sensors API", version="1.0.0")
@@ -100,58 +207,273 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Último dato de sensores: atributos con slots en lugar de un dict que se re-arma por request
+@dataclass(slots=True)
+class SensorCache:
+    sample_id: Optional[int] = None
+    timestamp: Optional[float] = None
+    ir_sensor: Optional[dict] = None
+    # gyro_sensor: Optional[dict] = None
+    robot_info: Optional[dict] = None
+    db_id: Optional[int] = None
+    created_at: Optional[str] = None
+
 # Almacenar últimas lecturas para WebSocket
-last_sensor_data = {}
+last_sensor_data = SensorCache()
 last_action = {"left_motor": 0, "right_motor": 0, "timestamp": None, "source": None}
 
+# Ventana de historial reciente: los "latest" se sirven desde memoria, sin consultar SQLite
+HISTORY_SIZE = 256
+recent_sensors: deque = deque(maxlen=HISTORY_SIZE)  # JSON (bytes) de cada muestra
+recent_actions: deque = deque(maxlen=HISTORY_SIZE)  # copia del dict de cada acción
+
+def _update_last_sensor_data(sample_id, timestamp, ir_sensor, robot_info, db_id, created_at):
+    """Actualizar el último dato de sensores junto con su JSON precalculado"""
+    cache = last_sensor_data
+    cache.sample_id = sample_id
+    cache.timestamp = timestamp
+    cache.ir_sensor = ir_sensor
+    cache.robot_info = robot_info
+    cache.db_id = db_id
+    cache.created_at = created_at
+    # orjson serializa dataclasses directamente
+    recent_sensors.append(orjson.dumps(cache))
+
+def _update_last_action(data: dict):
+    """Actualizar la última acción y registrarla en el historial"""
+    last_action.update(data)
+    recent_actions.append(dict(last_action))
+
+# created_at en ISO: la parte de fecha/hora se formatea una vez por segundo
+_last_iso_sec = 0
+_last_iso_str = ""
+
+def _iso_now() -> str:
+    """Hora UTC actual en ISO 8601, equivalente a datetime.utcnow().isoformat()"""
+    global _last_iso_sec, _last_iso_str
+    now = time.time()
+    sec = int(now)
+    if sec != _last_iso_sec:
+        _last_iso_sec = sec
+        _last_iso_str = datetime.utcfromtimestamp(sec).isoformat()
+    return f"{_last_iso_str}.{int((now - sec) * 1e6):06d}"
+
+# Colas de escritura diferida: sensores y acciones se insertan en lotes, no por mensaje
+FLUSH_BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.02  # segundos
+# Las colas se crean en startup_event para quedar ligadas al loop de uvicorn
+pending_sensor_rows: asyncio.Queue
+pending_action_rows: asyncio.Queue
+# IDs provisionales; se re-siembran con MAX(id) al arrancar
+sensor_id_counter = count(1)
+action_id_counter = count(1)
+
+# INSERT de Core compilados una vez; cada lote se ejecuta como un executemany
+_sensor_insert = SensorData.__table__.insert()
+_action_insert = ActionData.__table__.insert()
+
+def _flush_rows(statement, rows: List[dict]):
+    """Insertar un lote de filas en una sola transacción"""
+    db = SessionLocal()
+    try:
+        db.execute(statement, rows)
+        db.commit()
+        return
+    except Exception:
+        db.rollback()
+        if len(rows) == 1:
+            # El cliente ya recibió este id: dejar constancia de la fila perdida
+            logger.exception(
+                "Error storing %s row: dropped id %s",
+                statement.table.name, rows[0]["id"]
+            )
+            return
+    
+    # Una fila inválida no debe tirar el lote entero: reintentar de a una
+    for row in rows:
+        _flush_rows(statement, [row])
+
+async def _flush_loop(queue: asyncio.Queue, statement):
+    """Vaciar la cola cada FLUSH_BATCH_SIZE filas o FLUSH_INTERVAL segundos"""
+    loop = asyncio.get_running_loop()
+    while True:
+        rows = []
+        try:
+            rows.append(await queue.get())
+            deadline = loop.time() + FLUSH_INTERVAL
+            while len(rows) < FLUSH_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Cancelado en shutdown: guardar lo que ya se sacó de la cola
+            if rows:
+                _flush_rows(statement, rows)
+            raise
+        _flush_rows(statement, rows)
+
+def _drain(queue: asyncio.Queue) -> List[dict]:
+    rows = []
+    while not queue.empty():
+        rows.append(queue.get_nowait())
+    return rows
+
 # Manejo de conexiones WebSocket
 class ConnectionManager:
+    __slots__ = ("active_dashboard_connections", "active_robot_connections")
+    
     def __init__(self):
-        self.active_dashboard_connections: list[WebSocket] = []
-        self.active_robot_connections: list[WebSocket] = []
+        # Conjuntos: alta y baja en O(1)
+        self.active_dashboard_connections: set[WebSocket] = set()
+        self.active_robot_connections: set[WebSocket] = set()
         
     async def connect_dashboard(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_dashboard_connections.append(websocket)
+        self.active_dashboard_connections.add(websocket)
         
     async def connect_robot(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_robot_connections.append(websocket)
+        self.active_robot_connections.add(websocket)
         
     def disconnect_dashboard(self, websocket: WebSocket):
-        if websocket in self.active_dashboard_connections:
-            self.active_dashboard_connections.remove(websocket)
+        self.active_dashboard_connections.discard(websocket)
             
     def disconnect_robot(self, websocket: WebSocket):
-        if websocket in self.active_robot_connections:
-            self.active_robot_connections.remove(websocket)
+        self.active_robot_connections.discard(websocket)
             
     async def broadcast_sensor_data(self, data: dict):
         """Enviar datos de sensores a todos los dashboards conectados"""
-        for connection in self.active_dashboard_connections:
-            try:
-                await connection.send_json(data)
-            except:
-                self.disconnect_dashboard(connection)
+        # Serializar una sola vez para todas las conexiones
+        await self.broadcast_raw(orjson.dumps(data))
+    
+    async def broadcast_raw(self, payload: bytes):
+        """Enviar a los dashboards un mensaje ya serializado"""
+        failed = await self._fan_out(self.active_dashboard_connections, payload.decode())
+        for connection in failed:
+            self.disconnect_dashboard(connection)
                 
     async def send_action_to_robot(self, data: dict):
         """Enviar acción a todos los robots conectados"""
-        for connection in self.active_robot_connections:
-            try:
-                await connection.send_json(data)
-            except:
-                self.disconnect_robot(connection)
+        payload = orjson.dumps(data).decode()
+        failed = await self._fan_out(self.active_robot_connections, payload)
+        for connection in failed:
+            self.disconnect_robot(connection)
+    
+    @staticmethod
+    async def _fan_out(connections: set, payload: str) -> list:
+        """Enviar en paralelo; devuelve las conexiones que fallaron"""
+        # Copia: el conjunto puede cambiar mientras se espera a gather
+        connections = list(connections)
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+        return [
+            connection for connection, result in zip(connections, results)
+            if isinstance(result, BaseException)
+        ]
+
+async def send_json(websocket: WebSocket, data: dict):
+    """Enviar un mensaje JSON serializado con orjson (frame de texto)"""
+    await websocket.send_text(orjson.dumps(data).decode())
 
 manager = ConnectionManager()
 
+async def _ingest_sensor(payload: SensorPayload) -> dict:
+    """
+    Registrar una lectura de sensores (POST /sensors y /sensors/batch comparten este camino).
+    
+    Returns:
+        La fila encolada, con el id definitivo
+    """
+    # Convertir structs a dict una sola vez; la inserción la hace _flush_loop
+    ir_dict = msgspec.to_builtins(payload.ir_sensor)
+    # gyro_dict = msgspec.to_builtins(payload.gyro_sensor)
+    robot_info_dict = msgspec.to_builtins(payload.robot_info)
+    # created_at de la fila lo completa el default de la columna al guardar el lote
+    sensor_row = {
+        "id": next(sensor_id_counter),
+        "sample_id": payload.sample_id,
+        "timestamp": payload.timestamp,
+        "ir_sensor": ir_dict,
+        # "gyro_sensor": gyro_dict,
+        "robot_info": robot_info_dict
+    }
+    
+    await pending_sensor_rows.put(sensor_row)
+    
+    # Actualizar último dato para WebSocket
+    _update_last_sensor_data(
+        sample_id=payload.sample_id,
+        timestamp=payload.timestamp,
+        ir_sensor=ir_dict,
+        # gyro_sensor=gyro_dict,
+        robot_info=robot_info_dict,
+        db_id=sensor_row["id"],
+        created_at=_iso_now()
+    )
+    
+    # Enviar a dashboards conectados
+    await manager.broadcast_raw(recent_sensors[-1])
+    return sensor_row
+
+async def _ingest_action(left_motor: int, right_motor: int, source: str) -> dict:
+    """
+    Registrar una acción (POST /actions y /ws/robot comparten este camino).
+    
+    Encola la fila para el escritor en lote, actualiza la última acción en memoria
+    y notifica en paralelo a robots y dashboards.
+    
+    Returns:
+        La acción registrada, con el id definitivo
+    """
+    # Validar rango de motores
+    left_motor = max(-100, min(100, left_motor))
+    right_motor = max(-100, min(100, right_motor))
+    
+    # Encolar para inserción en lote; el id provisional es el definitivo
+    action_row = {
+        "id": next(action_id_counter),
+        "timestamp": time.time(),
+        "left_motor": left_motor,
+        "right_motor": right_motor,
+        "source": source
+    }
+    await pending_action_rows.put(action_row)
+    
+    _update_last_action({**action_row, "created_at": _iso_now()})
+    action = recent_actions[-1]
+    
+    await asyncio.gather(
+        manager.send_action_to_robot({
+            "action": "motor_control",
+            "left_motor": left_motor,
+            "right_motor": right_motor,
+            "timestamp": action_row["timestamp"],
+            "source": source
+        }),
+        manager.broadcast_raw(orjson.dumps({
+            "type": "action_update",
+            "action": action,
+            "timestamp": time.time()
+        }))
+    )
+    return action
+
 @app.get("/")
 async def root():
     return {
         "message": "Robot Sensors API",
         "endpoints": {
             "POST /sensors": "Guardar datos de sensores",
+            "POST /sensors/batch": "Guardar varias lecturas de sensores (lista JSON)",
             "GET /sensors/latest": "Obtener último registro de sensores",
             "POST /actions": "Enviar acción al robot",
+            "POST /actions/batch": "Enviar varias acciones (lista JSON)",
             "GET /actions": "Obtener todas las acciones (opcional: ?limit=N)",
             "GET /actions/latest": "Obtener última acción",
             "WebSocket /ws/dashboard": "WebSocket para dashboard",
@@ -159,72 +481,47 @@ async def root():
         }
     }
 
-@app.post("/sensors/")
-async def store_sensor_data(payload: SensorPayload, db: Session = Depends(get_db)):
+@app.post("/sensors/", openapi_extra=msgspec_openapi(SensorPayload))
+async def store_sensor_data(payload: SensorPayload = Depends(msgspec_body(SensorPayload))):
     """Endpoint para almacenar datos de sensores en SQLite"""
     try:
-        # Convertir modelos Pydantic a dict para almacenar en JSON
-        sensor_data = SensorData(
-            sample_id=payload.sample_id,
-            timestamp=payload.timestamp,
-            ir_sensor=payload.ir_sensor.dict(),
-            # gyro_sensor=payload.gyro_sensor.dict(),
-            robot_info=payload.robot_info.dict()
-        )
-        
-        db.add(sensor_data)
-        db.commit()
-        db.refresh(sensor_data)
+        sensor_row = await _ingest_sensor(payload)
         
-        # Actualizar último dato para WebSocket
-        last_sensor_data.update({
-            "sample_id": payload.sample_id,
-            "timestamp": payload.timestamp,
-            "ir_sensor": payload.ir_sensor.dict(),
-            # "gyro_sensor": payload.gyro_sensor.dict(),
-            "robot_info": payload.robot_info.dict(),
-            "db_id": sensor_data.id,
-            "created_at": datetime.utcnow().isoformat()
-        })
+        return {
+            "message": "Sensor data stored successfully",
+            "id": sensor_row["id"],
+            "sample_id": sensor_row["sample_id"]
+        }
         
-        # Enviar a dashboards conectados
-        await manager.broadcast_sensor_data(last_sensor_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing sensor data: {str(e)}")
+
+@app.post("/sensors/batch", openapi_extra=msgspec_openapi(List[SensorPayload]))
+async def store_sensor_batch(payloads: List[SensorPayload] = Depends(msgspec_body(List[SensorPayload]))):
+    """Endpoint para almacenar varias lecturas de sensores en un solo request"""
+    try:
+        sensor_rows = [await _ingest_sensor(payload) for payload in payloads]
         
         return {
             "message": "Sensor data stored successfully",
-            "id": sensor_data.id,
-            "sample_id": sensor_data.sample_id
+            "count": len(sensor_rows),
+            "ids": [row["id"] for row in sensor_rows]
         }
         
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Error storing sensor data: {str(e)}")
 
 @app.get("/sensors/latest")
-async def get_latest_sensor_data(db: Session = Depends(get_db)):
+async def get_latest_sensor_data():
     """Obtener el último registro de sensores"""
-    if not last_sensor_data:
-        latest = db.query(SensorData).order_by(SensorData.timestamp.desc()).first()
-        if latest:
-            last_sensor_data.update({
-                "sample_id": latest.sample_id,
-                "timestamp": latest.timestamp,
-                "ir_sensor": latest.ir_sensor,
-                # "gyro_sensor": latest.gyro_sensor,
-                "robot_info": latest.robot_info,
-                "db_id": latest.id,
-                "created_at": latest.created_at.isoformat()
-            })
-    
-    if not last_sensor_data:
+    if not recent_sensors:
         raise HTTPException(status_code=404, detail="No sensor data available")
     
-    return last_sensor_data
+    return Response(content=recent_sensors[-1], media_type="application/json")
 
-@app.post("/actions/", response_model=ActionResponse)
+@app.post("/actions/", response_model=ActionResponse, openapi_extra=msgspec_openapi(ActionPayload))
 async def create_action(
-    action: ActionPayload, 
-    db: Session = Depends(get_db)
+    action: ActionPayload = Depends(msgspec_body(ActionPayload))
 ):
     """
     Endpoint POST para enviar una acción al robot.
@@ -236,58 +533,44 @@ async def create_action(
         Información de la acción creada
     """
     try:
-        # Validar y ajustar valores de motores
-        left_motor = max(-100, min(100, action.left_motor))
-        right_motor = max(-100, min(100, action.right_motor))
+        return await _ingest_action(action.left_motor, action.right_motor, action.source or "api")
         
-        # Crear registro en base de datos
-        action_record = ActionData(
-            timestamp=time.time(),
-            left_motor=left_motor,
-            right_motor=right_motor,
-            source=action.source or "api"
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error storing action: {str(e)}"
         )
-        
-        db.add(action_record)
-        db.commit()
-        db.refresh(action_record)
-        
-        # Actualizar última acción en memoria
-        last_action.update({
-            "id": action_record.id,
-            "left_motor": left_motor,
-            "right_motor": right_motor,
-            "timestamp": action_record.timestamp,
-            "source": action_record.source,
-            "created_at": action_record.created_at.isoformat()
-        })
-        
-        # Enviar acción a robots conectados vía WebSocket
-        await manager.send_action_to_robot({
-            "action": "motor_control",
-            "left_motor": left_motor,
-            "right_motor": right_motor,
-            "timestamp": action_record.timestamp,
-            "source": action_record.source
-        })
-        
-        # Notificar a dashboards sobre nueva acción
-        await manager.broadcast_sensor_data({
-            "type": "action_update",
-            "action": last_action,
-            "timestamp": time.time()
-        })
-        
-        return action_record
+
+@app.post(
+    "/actions/batch",
+    response_model=List[ActionResponse],
+    openapi_extra=msgspec_openapi(List[ActionPayload])
+)
+async def create_action_batch(
+    actions: List[ActionPayload] = Depends(msgspec_body(List[ActionPayload]))
+):
+    """
+    Endpoint POST para enviar varias acciones en un solo request.
+    
+    Args:
+        actions: Lista de acciones (left_motor, right_motor, source)
+    
+    Returns:
+        Las acciones creadas, en el mismo orden
+    """
+    try:
+        return [
+            await _ingest_action(action.left_motor, action.right_motor, action.source or "api")
+            for action in actions
+        ]
         
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=500, 
-            detail=f"Error storing action: {str(e)}"
+            detail=f"Error storing actions: {str(e)}"
         )
 
-@app.get("/actions/", response_model=List[ActionResponse])
+@app.get("/actions/", response_model=None, responses={200: {"model": List[ActionResponse]}})
 async def get_actions(
     limit: Optional[int] = 100,
     offset: Optional[int] = 0,
@@ -301,16 +584,46 @@ async def get_actions(
         offset: Número de acciones a saltar (para paginación)
     
     Returns:
-        Lista de acciones ordenadas por timestamp descendente
+        Lista de acciones ordenadas por timestamp descendente. La primera página
+        (offset=0) incluye las acciones aún en la cola de escritura; las siguientes
+        salen solo de SQLite.
     """
     try:
-        actions = db.query(ActionData)\
-            .order_by(desc(ActionData.timestamp))\
-            .offset(offset)\
-            .limit(limit)\
-            .all()
+        # Tuplas de columnas (sin materializar objetos ORM), serializadas en una sola llamada
+        rows = db.execute(
+            select(
+                ActionData.id,
+                ActionData.left_motor,
+                ActionData.right_motor,
+                ActionData.timestamp,
+                ActionData.source,
+                ActionData.created_at
+            )
+            .order_by(desc(ActionData.timestamp))
+            .offset(offset)
+            .limit(limit)
+        ).all()
+        actions = [row._asdict() for row in rows]
         
-        return actions
+        if not offset:
+            # Acciones ya respondidas pero todavía sin guardar: las del historial
+            # en memoria con id mayor al más nuevo de SQLite
+            newest_id = rows[0].id if rows else 0
+            pending = []
+            for action in reversed(recent_actions):
+                if action["id"] <= newest_id:
+                    break
+                pending.append(action)
+            if pending:
+                actions = (pending + actions)[:limit]
+        
+        # X-Result-Count: cantidad de acciones en la respuesta, para clientes que
+        # leen la lista en streaming y no la materializan completa
+        return Response(
+            content=orjson.dumps(actions),
+            media_type="application/json",
+            headers={"X-Result-Count": str(len(actions))}
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -319,54 +632,21 @@ async def get_actions(
         )
 
 @app.get("/actions/latest", response_model=ActionResponse)
-async def get_latest_action(db: Session = Depends(get_db)):
+async def get_latest_action():
     """
     Obtener la última acción almacenada.
     
     Returns:
         Última acción registrada
     """
-    try:
-        # Primero intentar obtener de memoria
-        if last_action.get("id"):
-            # Buscar en base de datos para asegurar que tenemos el registro completo
-            action_record = db.query(ActionData).filter(
-                ActionData.id == last_action["id"]
-            ).first()
-            
-            if action_record:
-                return action_record
-        
-        # Si no hay en memoria, buscar en base de datos
-        action_record = db.query(ActionData)\
-            .order_by(desc(ActionData.timestamp))\
-            .first()
-        
-        if not action_record:
-            raise HTTPException(
-                status_code=404, 
-                detail="No actions available"
-            )
-        
-        # Actualizar último dato en memoria
-        last_action.update({
-            "id": action_record.id,
-            "left_motor": action_record.left_motor,
-            "right_motor": action_record.right_motor,
-            "timestamp": action_record.timestamp,
-            "source": action_record.source,
-            "created_at": action_record.created_at.isoformat()
-        })
-        
-        return action_record
-        
-    except HTTPException:
-        raise
-    except Exception as e:
+    # El historial en memoria se carga al arrancar; puede incluir acciones aún no guardadas
+    if not recent_actions:
         raise HTTPException(
-            status_code=500, 
-            detail=f"Error retrieving latest action: {str(e)}"
+            status_code=404, 
+            detail="No actions available"
         )
+    
+    return recent_actions[-1]
 
 @app.get("/actions/{action_id}", response_model=ActionResponse)
 async def get_action_by_id(
@@ -382,6 +662,14 @@ async def get_action_by_id(
     Returns:
         Información de la acción solicitada
     """
+    # Las acciones recientes pueden seguir en la cola de escritura: buscar primero
+    # en el historial en memoria (ids crecientes, de la más nueva a la más vieja)
+    for action in reversed(recent_actions):
+        if action["id"] == action_id:
+            return action
+        if action["id"] < action_id:
+            break
+    
     action_record = db.query(ActionData).filter(ActionData.id == action_id).first()
     
     if not action_record:
@@ -398,9 +686,9 @@ async def dashboard_websocket(websocket: WebSocket):
     await manager.connect_dashboard(websocket)
     
     # Enviar datos actuales inmediatamente al conectar
-    if last_sensor_data:
+    if last_sensor_data.db_id is not None:
         try:
-            await websocket.send_json({
+            await send_json(websocket, {
                 "type": "initial_data",
                 "sensors": last_sensor_data,
                 "last_action": last_action
@@ -430,62 +718,26 @@ async def robot_websocket(websocket: WebSocket):
                 
                 # Validar datos recibidos
                 if "left_motor" not in action_data or "right_motor" not in action_data:
-                    await websocket.send_json({"error": "Invalid action format"})
+                    await send_json(websocket, {"error": "Invalid action format"})
                     continue
                 
-                # Validar rango de motores
-                left_motor = max(-100, min(100, action_data["left_motor"]))
-                right_motor = max(-100, min(100, action_data["right_motor"]))
+                action = await _ingest_action(
+                    action_data["left_motor"], action_data["right_motor"], "websocket"
+                )
                 
-                # Almacenar en base de datos usando el endpoint POST
-                db = SessionLocal()
-                try:
-                    action_record = ActionData(
-                        timestamp=time.time(),
-                        left_motor=left_motor,
-                        right_motor=right_motor,
-                        source="websocket"
-                    )
-                    db.add(action_record)
-                    db.commit()
-                    db.refresh(action_record)
-                    
-                    # Actualizar última acción
-                    last_action.update({
-                        "id": action_record.id,
-                        "left_motor": left_motor,
-                        "right_motor": right_motor,
-                        "timestamp": action_record.timestamp,
-                        "source": action_record.source,
-                        "created_at": action_record.created_at.isoformat()
-                    })
-                    
-                    # Enviar confirmación
-                    await websocket.send_json({
-                        "status": "action_received",
-                        "left_motor": left_motor,
-                        "right_motor": right_motor,
-                        "timestamp": action_record.timestamp,
-                        "id": action_record.id
-                    })
-                    
-                    # Notificar a dashboards sobre nueva acción
-                    await manager.broadcast_sensor_data({
-                        "type": "action_update",
-                        "action": last_action,
-                        "timestamp": time.time()
-                    })
-                    
-                except Exception as e:
-                    db.rollback()
-                    await websocket.send_json({"error": f"Database error: {str(e)}"})
-                finally:
-                    db.close()
+                # Enviar confirmación
+                await send_json(websocket, {
+                    "status": "action_received",
+                    "left_motor": action["left_motor"],
+                    "right_motor": action["right_motor"],
+                    "timestamp": action["timestamp"],
+                    "id": action["id"]
+                })
                     
             except json.JSONDecodeError:
-                await websocket.send_json({"error": "Invalid JSON"})
+                await send_json(websocket, {"error": "Invalid JSON"})
             except Exception as e:
-                await websocket.send_json({"error": str(e)})
+                await send_json(websocket, {"error": str(e)})
                 
     except WebSocketDisconnect:
         manager.disconnect_robot(websocket)
@@ -494,25 +746,43 @@ async def robot_websocket(websocket: WebSocket):
 @app.on_event("startup")
 async def startup_event():
     """Inicializar datos al arrancar el servidor"""
+    global pending_sensor_rows, pending_action_rows, sensor_id_counter, action_id_counter
+    pending_sensor_rows = asyncio.Queue()
+    pending_action_rows = asyncio.Queue()
+    if CREATE_TABLES:
+        init_db()
+    
     db = SessionLocal()
     try:
-        # Cargar último dato de sensores al iniciar
-        latest_sensor = db.query(SensorData).order_by(desc(SensorData.timestamp)).first()
-        if latest_sensor:
-            last_sensor_data.update({
-                "sample_id": latest_sensor.sample_id,
-                "timestamp": latest_sensor.timestamp,
-                "ir_sensor": latest_sensor.ir_sensor,
-                # "gyro_sensor": latest_sensor.gyro_sensor,
-                "robot_info": latest_sensor.robot_info,
-                "db_id": latest_sensor.id,
-                "created_at": latest_sensor.created_at.isoformat()
-            })
+        # Continuar los IDs provisionales a partir del último registro
+        max_sensor_id = db.query(func.max(SensorData.id)).scalar() or 0
+        sensor_id_counter = count(max_sensor_id + 1)
+        max_action_id = db.query(func.max(ActionData.id)).scalar() or 0
+        action_id_counter = count(max_action_id + 1)
+        
+        # Cargar el historial reciente de sensores al iniciar (del más antiguo al más nuevo)
+        latest_sensors = db.query(SensorData)\
+            .order_by(desc(SensorData.timestamp))\
+            .limit(HISTORY_SIZE)\
+            .all()
+        for latest_sensor in reversed(latest_sensors):
+            _update_last_sensor_data(
+                sample_id=latest_sensor.sample_id,
+                timestamp=latest_sensor.timestamp,
+                ir_sensor=latest_sensor.ir_sensor,
+                # gyro_sensor=latest_sensor.gyro_sensor,
+                robot_info=latest_sensor.robot_info,
+                db_id=latest_sensor.id,
+                created_at=latest_sensor.created_at.isoformat()
+            )
         
-        # Cargar última acción al iniciar
-        latest_action = db.query(ActionData).order_by(desc(ActionData.timestamp)).first()
-        if latest_action:
-            last_action.update({
+        # Cargar el historial reciente de acciones al iniciar
+        latest_actions = db.query(ActionData)\
+            .order_by(desc(ActionData.timestamp))\
+            .limit(HISTORY_SIZE)\
+            .all()
+        for latest_action in reversed(latest_actions):
+            _update_last_action({
                 "id": latest_action.id,
                 "left_motor": latest_action.left_motor,
                 "right_motor": latest_action.right_motor,
@@ -522,7 +792,26 @@ async def startup_event():
             })
     finally:
         db.close()
+    
+    # Iniciar escritores en segundo plano
+    app.state.flush_tasks = [
+        asyncio.create_task(_flush_loop(pending_sensor_rows, _sensor_insert)),
+        asyncio.create_task(_flush_loop(pending_action_rows, _action_insert)),
+    ]
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener los escritores y guardar las filas pendientes"""
+    for task in app.state.flush_tasks:
+        task.cancel()
+    # Esperar a que cada escritor guarde el lote que tenía en curso
+    await asyncio.gather(*app.state.flush_tasks, return_exceptions=True)
+    for queue, statement in ((pending_sensor_rows, _sensor_insert), (pending_action_rows, _action_insert)):
+        rows = _drain(queue)
+        if rows:
+            _flush_rows(statement, rows)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools", ws="websockets",
+                ws_per_message_deflate=False)
\ No newline at end of file
@@ -1 +1 @@
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload
\ No newline at end of file
+uvicorn main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools --ws websockets --ws-per-message-deflate false --reload
\ No newline at end of file
@@ -1,18 +1,95 @@
 # test_robot_api.py
+import asyncio
+import io
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 import time
 import random
-from datetime import datetime
+import sys
+import threading
+from urllib.parse import urlsplit
 
 # Configuración
 BASE_URL = "http://127.0.0.1:8000"
+LEGACY = False  # --legacy: enviar los lotes fila por fila en lugar de /batch
+QUIET = False  # --quiet: sin salida por request en los tests de carga
 HEADERS = {"Content-Type": "application/json"}
+# Sub-dict constante de los payloads de sensores (se comparte, no se re-crea)
+ROBOT_INFO = {"platform": "EV3", "python_version": "ev3dev2"}
+
+# Alias de random ligados una sola vez
+_randint = random.randint
+_uniform = random.uniform
+_choice = random.choice
+_randrange = random.randrange
+
+# Sesión compartida: reutiliza la conexión TCP (keep-alive) entre requests
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=0, pool_block=True)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update(HEADERS)
+
+# Conexión HTTP persistente y liviana para los endpoints más usados
+_CONN = None
+_CONN_HEADERS = {**HEADERS, "Connection": "keep-alive"}
+
+def _request(method, path, body=None):
+    """Request sobre la conexión persistente; devuelve (status, body)"""
+    global _CONN
+    for attempt in range(2):
+        if _CONN is None:
+            url = urlsplit(BASE_URL)
+            _CONN = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        try:
+            _CONN.request(method, path, body=body, headers=_CONN_HEADERS)
+            response = _CONN.getresponse()
+            return response.status, response.read()
+        except (http.client.RemoteDisconnected, ConnectionError):
+            # El servidor cerró la conexión inactiva: reabrir y reintentar una vez
+            _close_conn()
+            if attempt:
+                raise
+
+# Cache de respuestas GET por URL; solo se crea con --mock (ver _cached_get)
+_GET_CACHE = None
+_GET_CACHE_LOCK = threading.Lock()
+
+def _enable_get_cache():
+    global _GET_CACHE
+    from cachetools import TTLCache
+    _GET_CACHE = TTLCache(maxsize=64, ttl=1.0)
+
+def _cached_get(url):
+    """SESSION.get con cache TTL por URL en modo --mock; sin --mock no cachea"""
+    if _GET_CACHE is None:
+        return SESSION.get(url)
+    with _GET_CACHE_LOCK:
+        response = _GET_CACHE.get(url)
+    if response is None:
+        response = SESSION.get(url)
+        with _GET_CACHE_LOCK:
+            _GET_CACHE[url] = response
+    return response
+
+def _post(path, body):
+    return _request("POST", path, body)
+
+def _close_conn():
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
 
 def test_root():
     """Test endpoint raíz"""
     print("\n=== Test Endpoint Raíz ===")
-    response = requests.get(f"{BASE_URL}/")
+    response = SESSION.get(f"{BASE_URL}/")
     print(f"Status: {response.status_code}")
     print(f"Response: {response.json()}")
     return response.status_code == 200
@@ -23,27 +100,24 @@ def test_post_sensor_data():
     
     # Datos de ejemplo coherentes
     sensor_data = {
-        "sample_id": random.randint(1, 1000),
+        "sample_id": _randint(1, 1000),
         "timestamp": time.time(),
         "ir_sensor": {
-            "proximity": random.randint(0, 100),  # 0-100 como en la especificación
+            "proximity": _randint(0, 100),  # 0-100 como en la especificación
             "remote_buttons": None,
-            "beacon_distance": random.randint(10, 80) if random.random() > 0.3 else None,
-            "beacon_heading": random.randint(0, 360) if random.random() > 0.3 else None
+            "beacon_distance": _randint(10, 80) if random.random() > 0.3 else None,
+            "beacon_heading": _randint(0, 360) if random.random() > 0.3 else None
         },
         "gyro_sensor": {
-            "angle": random.uniform(-180, 180),  # Ángulo entre -180 y 180 grados
-            "rate": random.uniform(-50, 50),     # Tasa de giro en grados/segundo
-            "calibrated": random.choice([True, False])
+            "angle": _uniform(-180, 180),  # Ángulo entre -180 y 180 grados
+            "rate": _uniform(-50, 50),     # Tasa de giro en grados/segundo
+            "calibrated": _choice([True, False])
         },
-        "robot_info": {
-            "platform": "EV3",
-            "python_version": "ev3dev2"
-        }
+        "robot_info": ROBOT_INFO
     }
     
     print(f"Enviando datos de sensor (sample_id: {sensor_data['sample_id']})")
-    response = requests.post(f"{BASE_URL}/sensors/", json=sensor_data, headers=HEADERS)
+    response = SESSION.post(f"{BASE_URL}/sensors/", data=orjson.dumps(sensor_data))
     print(f"Status: {response.status_code}")
     print(f"Response: {response.json()}")
     
@@ -51,50 +125,54 @@ def test_post_sensor_data():
 
 def test_get_latest_sensors():
     """Test para obtener el último dato de sensores"""
-    print("\n=== Test GET Últimos Sensores ===")
-    response = requests.get(f"{BASE_URL}/sensors/latest")
-    print(f"Status: {response.status_code}")
+    # Sin salida por request en modo --quiet
+    log = (lambda *a, **k: None) if QUIET else print
+    log("\n=== Test GET Últimos Sensores ===")
+    response = _cached_get(f"{BASE_URL}/sensors/latest")
+    log(f"Status: {response.status_code}")
     
     if response.status_code == 200:
-        data = response.json()
-        print(f"Último sample_id: {data.get('sample_id')}")
-        print(f"Timestamp: {datetime.fromtimestamp(data.get('timestamp')).strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"IR Proximity: {data['ir_sensor'].get('proximity')}")
-        print(f"Gyro Angle: {data['gyro_sensor'].get('angle'):.2f}°")
+        data = orjson.loads(response.content)
+        log(f"Último sample_id: {data.get('sample_id')}")
+        log(f"Timestamp: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.get('timestamp')))}")
+        log(f"IR Proximity: {data['ir_sensor'].get('proximity')}")
+        log(f"Gyro Angle: {data['gyro_sensor'].get('angle'):.2f}°")
         return True
     elif response.status_code == 404:
-        print("No hay datos de sensores aún")
+        log("No hay datos de sensores aún")
         return True
     else:
         print(f"Error: {response.text}")
         return False
 
+# Tipos de movimiento y fuentes para test_post_action (constantes, no se re-crean)
+_MOVEMENTS = (
+    {"name": "Avanzar", "left": 80, "right": 80},
+    {"name": "Retroceder", "left": -60, "right": -60},
+    {"name": "Girar derecha", "left": 50, "right": -50},
+    {"name": "Girar izquierda", "left": -50, "right": 50},
+    {"name": "Curva suave", "left": 70, "right": 40},
+    {"name": "Detener", "left": 0, "right": 0}
+)
+_SOURCES = ("api", "manual", "autonomous", "remote")
+
 def test_post_action():
     """Test para enviar una acción al robot"""
     print("\n=== Test POST Acción ===")
     
     # Simular diferentes tipos de movimiento
-    movement_types = [
-        {"name": "Avanzar", "left": 80, "right": 80},
-        {"name": "Retroceder", "left": -60, "right": -60},
-        {"name": "Girar derecha", "left": 50, "right": -50},
-        {"name": "Girar izquierda", "left": -50, "right": 50},
-        {"name": "Curva suave", "left": 70, "right": 40},
-        {"name": "Detener", "left": 0, "right": 0}
-    ]
-    
-    movement = random.choice(movement_types)
+    movement = _MOVEMENTS[_randrange(len(_MOVEMENTS))]
     
     action_data = {
         "left_motor": movement["left"],
         "right_motor": movement["right"],
-        "source": random.choice(["api", "manual", "autonomous", "remote"])
+        "source": _SOURCES[_randrange(len(_SOURCES))]
     }
     
     print(f"Enviando acción: {movement['name']}")
     print(f"Motores: L={movement['left']}, R={movement['right']}")
     
-    response = requests.post(f"{BASE_URL}/actions/", json=action_data, headers=HEADERS)
+    response = SESSION.post(f"{BASE_URL}/actions/", data=orjson.dumps(action_data))
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -108,38 +186,50 @@ def test_post_action():
 
 def test_get_latest_action():
     """Test para obtener la última acción"""
-    print("\n=== Test GET Última Acción ===")
-    response = requests.get(f"{BASE_URL}/actions/latest")
-    print(f"Status: {response.status_code}")
+    # Sin salida por request en modo --quiet
+    log = (lambda *a, **k: None) if QUIET else print
+    log("\n=== Test GET Última Acción ===")
+    response = _cached_get(f"{BASE_URL}/actions/latest")
+    log(f"Status: {response.status_code}")
     
     if response.status_code == 200:
-        data = response.json()
-        print(f"Última acción ID: {data['id']}")
-        print(f"Motores: L={data['left_motor']}, R={data['right_motor']}")
-        print(f"Fuente: {data['source']}")
-        print(f"Hora: {datetime.fromisoformat(data['created_at']).strftime('%H:%M:%S')}")
+        data = orjson.loads(response.content)
+        log(f"Última acción ID: {data['id']}")
+        log(f"Motores: L={data['left_motor']}, R={data['right_motor']}")
+        log(f"Fuente: {data['source']}")
+        # created_at es ISO (YYYY-MM-DDTHH:MM:SS...): la hora sale de un slice
+        log(f"Hora: {data['created_at'][11:19]}")
         return True
     elif response.status_code == 404:
-        print("No hay acciones aún")
+        log("No hay acciones aún")
         return True
     else:
         print(f"Error: {response.text}")
         return False
 
-def test_get_actions_list():
+def test_get_actions_list(shared_state=None):
     """Test para obtener lista de acciones"""
     print("\n=== Test GET Lista de Acciones ===")
-    limit = random.randint(3, 10)
-    response = requests.get(f"{BASE_URL}/actions/?limit={limit}")
+    limit = _randint(3, 10)
+    # En streaming la respuesta se consume una sola vez: no pasa por _cached_get
+    response = SESSION.get(f"{BASE_URL}/actions/?limit={limit}", stream=True)
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
-        actions = response.json()
-        print(f"Total acciones obtenidas: {len(actions)}")
+        import ijson
         
-        if actions:
+        # Parsear en streaming solo las 3 primeras; el total viene en el header
+        try:
+            actions_head = list(islice(ijson.items(response.raw, "item"), 3))
+        finally:
+            response.close()
+        print(f"Total acciones obtenidas: {response.headers.get('X-Result-Count')}")
+        
+        if actions_head:
+            if shared_state is not None:
+                shared_state["last_action_id"] = actions_head[0]["id"]
             print("\nÚltimas acciones:")
-            for i, action in enumerate(actions[:3]):  # Mostrar solo las 3 primeras
+            for i, action in enumerate(actions_head):  # Mostrar solo las 3 primeras
                 print(f"  {i+1}. ID:{action['id']} | L:{action['left_motor']:3} R:{action['right_motor']:3} | {action['source']}")
         
         return True
@@ -147,21 +237,26 @@ def test_get_actions_list():
         print(f"Error: {response.text}")
         return False
 
-def test_get_action_by_id():
+def test_get_action_by_id(shared_state=None):
     """Test para obtener una acción específica por ID"""
     print("\n=== Test GET Acción por ID ===")
     
-    # Primero obtenemos la lista para tener un ID válido
-    response = requests.get(f"{BASE_URL}/actions/?limit=1")
-    if response.status_code == 200 and response.json():
-        action_id = response.json()[0]['id']
+    if shared_state and "last_action_id" in shared_state:
+        # test_get_actions_list ya trajo un ID válido
+        action_id = shared_state["last_action_id"]
+    else:
+        # Primero obtenemos la última acción para tener un ID válido
+        # (/actions/latest sale de memoria: incluye acciones aún no guardadas)
+        response = SESSION.get(f"{BASE_URL}/actions/latest")
+        action_id = orjson.loads(response.content)['id'] if response.status_code == 200 else None
+    if action_id is not None:
         
         print(f"Buscando acción con ID: {action_id}")
-        response = requests.get(f"{BASE_URL}/actions/{action_id}")
+        response = SESSION.get(f"{BASE_URL}/actions/{action_id}")
         print(f"Status: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             print(f"Encontrada acción ID: {data['id']}")
             print(f"Motores: L={data['left_motor']}, R={data['right_motor']}")
             return True
@@ -174,187 +269,303 @@ def test_get_action_by_id():
     
     return False
 
+# Payloads fijos del escenario secuencial, serializados una sola vez al importar.
+# El timestamp de los sensores se completa en cada envío sobre la marca _TS.
+_TS = b'"__TS__"'
+
+_SCN_SENSOR1_TMPL = {
+    "sample_id": 100,
+    "timestamp": "__TS__",
+    "ir_sensor": {
+        "proximity": 95,  # Muy cerca!
+        "remote_buttons": None,
+        "beacon_distance": None,
+        "beacon_heading": None
+    },
+    "gyro_sensor": {
+        "angle": 45.5,
+        "rate": 0.0,
+        "calibrated": True
+    },
+    "robot_info": ROBOT_INFO
+}
+_SCN_ACTION1 = {
+    "left_motor": -80,
+    "right_motor": 80,
+    "source": "autonomous_avoidance"
+}
+_SCN_SENSOR2_TMPL = {
+    "sample_id": 101,
+    "timestamp": "__TS__",
+    "ir_sensor": {
+        "proximity": 30,  # Ya no hay obstáculo cercano
+        "remote_buttons": None,
+        "beacon_distance": 50,
+        "beacon_heading": 120
+    },
+    "gyro_sensor": {
+        "angle": 135.5,
+        "rate": 45.2,
+        "calibrated": True
+    },
+    "robot_info": ROBOT_INFO
+}
+_SCN_ACTION2 = {
+    "left_motor": 60,
+    "right_motor": 60,
+    "source": "autonomous_navigation"
+}
+_SCN_SENSOR1_B = orjson.dumps(_SCN_SENSOR1_TMPL)
+_SCN_ACTION1_B = orjson.dumps(_SCN_ACTION1)
+_SCN_SENSOR2_B = orjson.dumps(_SCN_SENSOR2_TMPL)
+_SCN_ACTION2_B = orjson.dumps(_SCN_ACTION2)
+
+def _stamp(template):
+    """Completar el timestamp de un payload pre-serializado"""
+    return template.replace(_TS, repr(time.time()).encode())
+
 def test_sequential_scenario():
     """Test de escenario secuencial más realista"""
-    print("\n=== Test Escenario Secuencial ===")
-    print("Simulando operación del robot...")
+    # Sin salida por request en modo --quiet
+    log = (lambda *a, **k: None) if QUIET else print
+    log("\n=== Test Escenario Secuencial ===")
+    log("Simulando operación del robot...")
     
     # Paso 1: Robot detecta obstáculo
-    print("\n1. Robot detecta obstáculo cercano")
-    sensor_data = {
-        "sample_id": 100,
-        "timestamp": time.time(),
-        "ir_sensor": {
-            "proximity": 95,  # Muy cerca!
-            "remote_buttons": None,
-            "beacon_distance": None,
-            "beacon_heading": None
-        },
-        "gyro_sensor": {
-            "angle": 45.5,
-            "rate": 0.0,
-            "calibrated": True
-        },
-        "robot_info": {
-            "platform": "EV3",
-            "python_version": "ev3dev2"
-        }
-    }
-    
-    response = requests.post(f"{BASE_URL}/sensors/", json=sensor_data, headers=HEADERS)
-    print(f"  Sensor: proximity={sensor_data['ir_sensor']['proximity']}")
+    log("\n1. Robot detecta obstáculo cercano")
+    sensor_data = _SCN_SENSOR1_TMPL
+    _post("/sensors/", _stamp(_SCN_SENSOR1_B))
+    log(f"  Sensor: proximity={sensor_data['ir_sensor']['proximity']}")
     
     # Paso 2: Tomar acción evasiva
-    print("\n2. Tomando acción evasiva")
-    action_data = {
-        "left_motor": -80,
-        "right_motor": 80,
-        "source": "autonomous_avoidance"
-    }
-    response = requests.post(f"{BASE_URL}/actions/", json=action_data, headers=HEADERS)
-    print(f"  Acción: Giro rápido L={action_data['left_motor']}, R={action_data['right_motor']}")
+    log("\n2. Tomando acción evasiva")
+    action_data = _SCN_ACTION1
+    # El giro dura 0.5 s desde que se envía la acción, no desde que responde
+    turn_deadline = time.monotonic() + 0.5
+    _post("/actions/", _SCN_ACTION1_B)
+    log(f"  Acción: Giro rápido L={action_data['left_motor']}, R={action_data['right_motor']}")
     
     # Paso 3: Nueva lectura después de girar
-    time.sleep(0.5)
-    print("\n3. Nueva lectura después del giro")
-    sensor_data = {
-        "sample_id": 101,
-        "timestamp": time.time(),
-        "ir_sensor": {
-            "proximity": 30,  # Ya no hay obstáculo cercano
-            "remote_buttons": None,
-            "beacon_distance": 50,
-            "beacon_heading": 120
-        },
-        "gyro_sensor": {
-            "angle": 135.5,
-            "rate": 45.2,
-            "calibrated": True
-        },
-        "robot_info": {
-            "platform": "EV3",
-            "python_version": "ev3dev2"
-        }
-    }
-    
-    response = requests.post(f"{BASE_URL}/sensors/", json=sensor_data, headers=HEADERS)
-    print(f"  Sensor: proximity={sensor_data['ir_sensor']['proximity']}, angle={sensor_data['gyro_sensor']['angle']:.1f}°")
+    sleep_for = turn_deadline - time.monotonic()
+    if sleep_for > 0:
+        time.sleep(sleep_for)
+    log("\n3. Nueva lectura después del giro")
+    sensor_data = _SCN_SENSOR2_TMPL
+    sensor_resp = orjson.loads(_post("/sensors/", _stamp(_SCN_SENSOR2_B))[1])
+    log(f"  Sensor: proximity={sensor_data['ir_sensor']['proximity']}, angle={sensor_data['gyro_sensor']['angle']:.1f}°")
     
     # Paso 4: Continuar movimiento
-    print("\n4. Continuar movimiento hacia baliza")
-    action_data = {
-        "left_motor": 60,
-        "right_motor": 60,
-        "source": "autonomous_navigation"
-    }
-    response = requests.post(f"{BASE_URL}/actions/", json=action_data, headers=HEADERS)
-    print(f"  Acción: Avanzar L={action_data['left_motor']}, R={action_data['right_motor']}")
-    
-    # Verificar estado final
-    print("\n5. Estado final del sistema")
-    sensors = requests.get(f"{BASE_URL}/sensors/latest").json()
-    action = requests.get(f"{BASE_URL}/actions/latest").json()
+    log("\n4. Continuar movimiento hacia baliza")
+    action_data = _SCN_ACTION2
+    action = orjson.loads(_post("/actions/", _SCN_ACTION2_B)[1])
+    log(f"  Acción: Avanzar L={action_data['left_motor']}, R={action_data['right_motor']}")
     
-    print(f"  Último sensor: sample_id={sensors.get('sample_id')}, proximity={sensors['ir_sensor'].get('proximity')}")
-    print(f"  Última acción: L={action.get('left_motor')}, R={action.get('right_motor')}, source={action.get('source')}")
+    # Verificar estado final (con las respuestas de los POST, sin GETs extra)
+    log("\n5. Estado final del sistema")
+    log(f"  Último sensor: sample_id={sensor_resp.get('sample_id')}, proximity={sensor_data['ir_sensor'].get('proximity')}")
+    log(f"  Última acción: L={action.get('left_motor')}, R={action.get('right_motor')}, source={action.get('source')}")
     
     return True
 
-def test_batch_operations():
-    """Test de operaciones por lotes"""
-    print("\n=== Test Operaciones por Lotes ===")
-    print("Enviando múltiples lecturas de sensores...")
-    
-    success_count = 0
-    for i in range(5):
-        sensor_data = {
-            "sample_id": 200 + i,
-            "timestamp": time.time() + i * 0.1,
-            "ir_sensor": {
-                "proximity": random.randint(20, 80),
-                "remote_buttons": [random.choice(["red_up", "blue_down", None])],
-                "beacon_distance": random.randint(10, 100),
-                "beacon_heading": random.randint(0, 359)
-            },
-            "gyro_sensor": {
-                "angle": random.uniform(0, 360),
-                "rate": random.uniform(-10, 10),
-                "calibrated": True
-            },
-            "robot_info": {
-                "platform": "EV3",
-                "python_version": "ev3dev2"
+async def _post_rows(post, path, payloads):
+    """Enviar filas en un solo POST a {path}batch; si el servidor no lo soporta, una por una"""
+    if not LEGACY:
+        response = await post(f"{path}batch", content=orjson.dumps(payloads))
+        if response.status_code == 200:
+            return len(payloads)
+        if response.status_code not in (404, 405):
+            return 0
+    
+    responses = await asyncio.gather(
+        *(post(path, content=orjson.dumps(p)) for p in payloads)
+    )
+    return sum(1 for r in responses if r.status_code == 200)
+
+async def test_batch_operations():
+    """Test de operaciones por lotes (requests concurrentes)"""
+    # Sin salida por request en modo --quiet
+    log = (lambda *a, **k: None) if QUIET else print
+    log("\n=== Test Operaciones por Lotes ===")
+    log("Enviando múltiples lecturas de sensores...")
+    
+    # httpx solo lo usa este test: importarlo acá no carga su costo en --quick
+    import httpx
+    
+    # El servidor (uvicorn) solo habla HTTP/1.1: la concurrencia sale del pool de conexiones
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        headers=HEADERS,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=30.0
+    ) as client:
+        # Generar cada campo aleatorio por columna y armar los dicts al final
+        n_sensors = 5
+        n_actions = 3
+        randint, uniform, choice = _randint, _uniform, _choice
+        now = time.time()
+        prox = [randint(20, 80) for _ in range(n_sensors)]
+        buttons = [choice(["red_up", "blue_down", None]) for _ in range(n_sensors)]
+        beacon_d = [randint(10, 100) for _ in range(n_sensors)]
+        beacon_h = [randint(0, 359) for _ in range(n_sensors)]
+        angle = [uniform(0, 360) for _ in range(n_sensors)]
+        rate = [uniform(-10, 10) for _ in range(n_sensors)]
+        
+        sensor_payloads = [
+            {
+                "sample_id": 200 + i,
+                "timestamp": now + i * 0.1,
+                "ir_sensor": {
+                    "proximity": prox[i],
+                    "remote_buttons": [buttons[i]],
+                    "beacon_distance": beacon_d[i],
+                    "beacon_heading": beacon_h[i]
+                },
+                "gyro_sensor": {
+                    "angle": angle[i],
+                    "rate": rate[i],
+                    "calibrated": True
+                },
+                "robot_info": ROBOT_INFO
             }
-        }
+            for i in range(n_sensors)
+        ]
         
-        response = requests.post(f"{BASE_URL}/sensors/", json=sensor_data, headers=HEADERS)
-        if response.status_code == 200:
-            success_count += 1
+        post = client.post
+        success_count = await _post_rows(post, "/sensors/", sensor_payloads)
         
-        # Pequeña pausa entre lecturas
-        time.sleep(0.1)
-    
-    print(f"Enviadas {success_count}/5 lecturas de sensores")
-    
-    # Enviar algunas acciones
-    print("\nEnviando múltiples acciones...")
-    action_count = 0
-    for i in range(3):
-        action_data = {
-            "left_motor": random.randint(-100, 100),
-            "right_motor": random.randint(-100, 100),
-            "source": f"batch_test_{i}"
-        }
+        log(f"Enviadas {success_count}/{n_sensors} lecturas de sensores")
         
-        response = requests.post(f"{BASE_URL}/actions/", json=action_data, headers=HEADERS)
-        if response.status_code == 200:
-            action_count += 1
+        # Enviar algunas acciones
+        log("\nEnviando múltiples acciones...")
+        motors = [randint(-100, 100) for _ in range(2 * n_actions)]
+        action_payloads = [
+            {
+                "left_motor": motors[2 * i],
+                "right_motor": motors[2 * i + 1],
+                "source": f"batch_test_{i}"
+            }
+            for i in range(n_actions)
+        ]
         
-        time.sleep(0.05)
+        action_count = await _post_rows(post, "/actions/", action_payloads)
     
-    print(f"Enviadas {action_count}/3 acciones")
+    log(f"Enviadas {action_count}/{n_actions} acciones")
     return success_count > 0
 
-def run_all_tests():
-    """Ejecutar todos los tests"""
+def _run_test(test_name, test_func):
+    """Ejecutar un test y devolver si pasó"""
+    try:
+        print(f"\n{'='*40}")
+        print(f"Ejecutando: {test_name}")
+        print('='*40)
+        
+        if asyncio.iscoroutinefunction(test_func):
+            success = asyncio.run(test_func())
+        else:
+            success = test_func()
+        
+        if success:
+            print(f"✓ {test_name}: PASS")
+        else:
+            print(f"✗ {test_name}: FAIL")
+        return success
+        
+    except Exception as e:
+        print(f"✗ {test_name}: ERROR - {str(e)}")
+        return False
+
+class _ThreadStdout:
+    """sys.stdout que redirige la salida de cada thread a su buffer, si lo tiene"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def _target(self):
+        return getattr(self._local, "buffer", None) or self._stream
+    
+    def write(self, text):
+        return self._target().write(text)
+    
+    def flush(self):
+        self._target().flush()
+
+def _run_test_buffered(stdout, test_name, test_func):
+    """Ejecutar un test en un thread del pool, juntando su salida en un buffer"""
+    stdout._local.buffer = io.StringIO()
+    try:
+        return _run_test(test_name, test_func), stdout._local.buffer.getvalue()
+    finally:
+        stdout._local.buffer = None
+
+def _run_parallel(group):
+    """Ejecutar un grupo de tests en paralelo e imprimir su salida en orden"""
+    stdout = _ThreadStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        # SESSION es segura entre threads (pool de urllib3)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                (test_name, executor.submit(_run_test_buffered, stdout, test_name, test_func))
+                for test_name, test_func in group
+            ]
+    finally:
+        sys.stdout = stdout._stream
+    
+    outcomes = {}
+    for test_name, future in futures:
+        outcomes[test_name], output = future.result()
+        sys.stdout.write(output)
+    return outcomes
+
+def run_all_tests(shared_state=None):
+    """
+    Ejecutar todos los tests.
+    
+    Args:
+        shared_state: Estado compartido entre tests (p. ej. last_action_id),
+            para no repetir requests que otro test ya hizo
+    """
+    if shared_state is None:
+        shared_state = {}
     print("=" * 60)
     print("INICIANDO TESTS DEL API DEL ROBOT")
     print("=" * 60)
     
+    # (nombre, función, parallel_safe): los probes de solo lectura seguidos corren
+    # en paralelo; los POST y los tests con estado corren solos, en orden
     tests = [
-        ("Root endpoint", test_root),
-        ("POST sensores (aleatorio)", test_post_sensor_data),
-        ("GET últimos sensores", test_get_latest_sensors),
-        ("POST acción (aleatoria)", test_post_action),
-        ("GET última acción", test_get_latest_action),
-        ("GET lista acciones", test_get_actions_list),
-        ("GET acción por ID", test_get_action_by_id),
-        ("Escenario secuencial", test_sequential_scenario),
-        ("Operaciones por lotes", test_batch_operations),
+        ("Root endpoint", test_root, True),
+        ("POST sensores (aleatorio)", test_post_sensor_data, False),
+        ("POST acción (aleatoria)", test_post_action, False),
+        ("GET últimos sensores", test_get_latest_sensors, True),
+        ("GET última acción", test_get_latest_action, True),
+        ("GET lista acciones", partial(test_get_actions_list, shared_state), True),
+        ("GET acción por ID", partial(test_get_action_by_id, shared_state), False),
+        ("Escenario secuencial", test_sequential_scenario, False),
+        ("Operaciones por lotes", test_batch_operations, False),
     ]
     
-    results = []
+    outcomes = {}
     
-    for test_name, test_func in tests:
-        try:
-            print(f"\n{'='*40}")
-            print(f"Ejecutando: {test_name}")
-            print('='*40)
-            
-            success = test_func()
-            results.append((test_name, success))
-            
-            if success:
-                print(f"✓ {test_name}: PASS")
-            else:
-                print(f"✗ {test_name}: FAIL")
-            
-            # Pequeña pausa entre tests
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"✗ {test_name}: ERROR - {str(e)}")
-            results.append((test_name, False))
+    try:
+        group = []
+        for test_name, test_func, parallel_safe in tests:
+            if parallel_safe:
+                group.append((test_name, test_func))
+                continue
+            if group:
+                outcomes.update(_run_parallel(group))
+                group = []
+            outcomes[test_name] = _run_test(test_name, test_func)
+        if group:
+            outcomes.update(_run_parallel(group))
+    finally:
+        SESSION.close()
+        _close_conn()
+    
+    # Reportar en el orden original
+    results = [(test_name, outcomes[test_name]) for test_name, _, _ in tests]
     
     # Resumen
     print("\n" + "=" * 60)
@@ -381,7 +592,7 @@ def quick_test():
     
     try:
         # Verificar que el servidor está activo
-        response = requests.get(f"{BASE_URL}/", timeout=5)
+        response = SESSION.get(f"{BASE_URL}/", timeout=5)
         print(f"Servidor activo: {response.status_code == 200}")
         
         # Enviar un dato de sensor
@@ -390,20 +601,20 @@ def quick_test():
             "timestamp": time.time(),
             "ir_sensor": {"proximity": 50, "remote_buttons": None, "beacon_distance": 30, "beacon_heading": 45},
             "gyro_sensor": {"angle": 90.5, "rate": 2.3, "calibrated": True},
-            "robot_info": {"platform": "EV3", "python_version": "ev3dev2"}
+            "robot_info": ROBOT_INFO
         }
         
-        response = requests.post(f"{BASE_URL}/sensors/", json=sensor_data, headers=HEADERS)
+        response = SESSION.post(f"{BASE_URL}/sensors/", data=orjson.dumps(sensor_data))
         print(f"Sensor enviado: {response.status_code == 200}")
         
         # Enviar una acción
         action_data = {"left_motor": 75, "right_motor": 75, "source": "quick_test"}
-        response = requests.post(f"{BASE_URL}/actions/", json=action_data, headers=HEADERS)
+        response = SESSION.post(f"{BASE_URL}/actions/", data=orjson.dumps(action_data))
         print(f"Acción enviada: {response.status_code == 200}")
         
         # Verificar datos
-        sensors = requests.get(f"{BASE_URL}/sensors/latest").status_code == 200
-        actions = requests.get(f"{BASE_URL}/actions/latest").status_code == 200
+        sensors = SESSION.get(f"{BASE_URL}/sensors/latest").status_code == 200
+        actions = SESSION.get(f"{BASE_URL}/actions/latest").status_code == 200
         
         print(f"Datos recuperados: Sensores={sensors}, Acciones={actions}")
         
@@ -421,6 +632,8 @@ def quick_test():
     except Exception as e:
         print(f"\n✗ Error inesperado: {str(e)}")
         return False
+    finally:
+        SESSION.close()
 
 if __name__ == "__main__":
     import argparse
@@ -429,15 +642,25 @@ if __name__ == "__main__":
     parser.add_argument("--quick", action="store_true", help="Ejecutar test rápido")
     parser.add_argument("--real-scenario", action="store_true", help="Ejecutar un escenario secuencial realista")
     parser.add_argument("--url", default="http://localhost:8000", help="URL del servidor")
+    parser.add_argument("--quiet", action="store_true", help="Sin salida por request en los tests de carga")
+    parser.add_argument("--mock", action="store_true", help="Cachear GETs repetidos (1 s) contra un servidor mock")
+    parser.add_argument("--legacy", action="store_true", help="Enviar los lotes fila por fila (sin /batch)")
     
     args = parser.parse_args()
     BASE_URL = args.url
+    LEGACY = args.legacy
+    QUIET = args.quiet
+    if args.mock:
+        _enable_get_cache()
     
     print(f"Conectando a: {BASE_URL}")
     
     if args.quick:
         quick_test()
     elif args.real_scenario:
-        test_sequential_scenario()
+        try:
+            test_sequential_scenario()
+        finally:
+            _close_conn()
     else:
         run_all_tests()
\ No newline at end of file